@@ -0,0 +1,33 @@
+# Multi-worker production server for the Go VV API.
+#
+#   cd backend && gunicorn -c gunicorn.conf.py server:app
+#
+# Each worker runs its own event loop and opens its own Mongo client in the
+# FastAPI lifespan, so keep WEB_CONCURRENCY * MONGO_MAX_POOL_SIZE below the
+# connection limit of the Mongo deployment.
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8001")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# Ends open /api/events streams when shutdown starts so workers can drain (see workers.py)
+worker_class = "workers.DrainingUvicornWorker"
+
+# Do not import the app in the master: nothing (sockets, event loops) may be shared across forks
+preload_app = False
+
+# Graceful draining: on SIGTERM workers stop accepting connections and get
+# graceful_timeout seconds to finish in-flight requests and run lifespan shutdown
+# (flush buffered activity writes, close the Mongo pool). Any request still open
+# graceful_timeout - 10 seconds after SIGTERM is cancelled so lifespan shutdown gets to run.
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.environ.get("WORKER_TIMEOUT", "60"))
+keepalive = int(os.environ.get("KEEPALIVE", "5"))
+
+# Recycle workers periodically to bound memory growth; jitter avoids restarting all at once
+max_requests = int(os.environ.get("MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.environ.get("MAX_REQUESTS_JITTER", "1000"))
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get("LOG_LEVEL", "info")
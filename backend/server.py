@@ -1,16 +1,30 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
+from contextlib import asynccontextmanager
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import WriteConcern, UpdateOne, ReplaceOne, ReturnDocument, monitoring
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
 from dotenv import load_dotenv
 from pathlib import Path
-from datetime import datetime, timezone, date, time
+from datetime import datetime, timezone, date, time, timedelta
 import os
 import uuid
+import asyncio
+import csv
+import io
+import itertools
+import json
 import logging
 import smtplib
+import socket
 from email.mime.text import MIMEText
+from xml.sax.saxutils import escape as xml_escape
+import numpy as np
+import zstandard
+from bson import Binary
 
 # ------------------------------------------------------------
 # Environment & DB Setup
@@ -23,13 +37,117 @@ DB_NAME = os.environ.get('DB_NAME')
 if not MONGO_URL or not DB_NAME:
     raise RuntimeError("Missing MONGO_URL or DB_NAME in backend/.env")
 
-client = AsyncIOMotorClient(MONGO_URL)
-db = client[DB_NAME]
+def _env_int(name: str, default: Optional[int] = None) -> Optional[int]:
+    val = os.environ.get(name)
+    return int(val) if val else default
+
+# Connection pool & timeouts (per worker process; total connections = workers * max pool size)
+MONGO_MAX_POOL_SIZE = _env_int('MONGO_MAX_POOL_SIZE', 100)
+MONGO_MIN_POOL_SIZE = _env_int('MONGO_MIN_POOL_SIZE', 0)
+MONGO_MAX_IDLE_TIME_MS = _env_int('MONGO_MAX_IDLE_TIME_MS')
+MONGO_WAIT_QUEUE_TIMEOUT_MS = _env_int('MONGO_WAIT_QUEUE_TIMEOUT_MS')
+MONGO_SERVER_SELECTION_TIMEOUT_MS = _env_int('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)
+MONGO_CONNECT_TIMEOUT_MS = _env_int('MONGO_CONNECT_TIMEOUT_MS', 10000)
+MONGO_SOCKET_TIMEOUT_MS = _env_int('MONGO_SOCKET_TIMEOUT_MS')
+
+
+class PoolUsageListener(monitoring.ConnectionPoolListener):
+    """Counts open and checked-out pool connections for the readiness endpoint."""
+
+    def __init__(self) -> None:
+        self.open = 0
+        self.in_use = 0
+        self.checkout_failures = 0
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_check_out_started(self, event): pass
+
+    def connection_created(self, event):
+        self.open += 1
+
+    def connection_closed(self, event):
+        self.open -= 1
+
+    def connection_check_out_failed(self, event):
+        self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        self.in_use += 1
+
+    def connection_checked_in(self, event):
+        self.in_use -= 1
+
+
+def create_mongo_client(listener: PoolUsageListener) -> AsyncIOMotorClient:
+    options: Dict[str, Any] = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+    }
+    return AsyncIOMotorClient(
+        MONGO_URL,
+        event_listeners=[listener],
+        **{k: v for k, v in options.items() if v is not None},
+    )
+
+# Created per worker inside the app lifespan (never at import, so forked workers don't share sockets)
+client: Optional[AsyncIOMotorClient] = None
+db: Any = None
+pool_listener = PoolUsageListener()
+
+# Optional write-behind mode for activity inserts (group commit)
+ACTIVITY_WRITE_BUFFER = os.environ.get('ACTIVITY_WRITE_BUFFER', 'false').lower() in ('1', 'true', 'yes')
+ACTIVITY_WRITE_BATCH_SIZE = int(os.environ.get('ACTIVITY_WRITE_BATCH_SIZE', '100'))
+ACTIVITY_WRITE_MAX_DELAY_MS = int(os.environ.get('ACTIVITY_WRITE_MAX_DELAY_MS', '20'))
+ACTIVITY_WRITE_CONCERN_W = os.environ.get('ACTIVITY_WRITE_CONCERN_W', '1')
+ACTIVITY_WRITE_CONCERN_J = os.environ.get('ACTIVITY_WRITE_CONCERN_J', 'false').lower() in ('1', 'true', 'yes')
 
 # ------------------------------------------------------------
 # FastAPI App with /api prefix router
 # ------------------------------------------------------------
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    global client, db, activity_write_buffer, pool_listener, indexes_ready
+    pool_listener = PoolUsageListener()
+    client = create_mongo_client(pool_listener)
+    db = client[DB_NAME]
+    indexes_ready = False
+    event_broker.open()
+    # Mongo may not be reachable yet when workers boot; keep retrying in the background and
+    # report not-ready (503) until the unique indexes the write paths rely on exist
+    background_jobs["prepare-database"] = asyncio.create_task(prepare_database())
+    if ACTIVITY_WRITE_BUFFER:
+        activity_write_buffer = ActivityWriteBuffer(
+            db.activities,
+            batch_size=ACTIVITY_WRITE_BATCH_SIZE,
+            max_delay_ms=ACTIVITY_WRITE_MAX_DELAY_MS,
+            write_concern=_write_concern_from_env(),
+        )
+        activity_write_buffer.start()
+    if TIERING_INTERVAL_SEC > 0:
+        background_jobs["tiering"] = asyncio.create_task(tiering_loop())
+    try:
+        yield
+    finally:
+        event_broker.close()
+        # Graceful shutdown: checkpoint background jobs, flush buffered writes, close the pool
+        for task in list(background_jobs.values()):
+            task.cancel()
+        await asyncio.gather(*background_jobs.values(), return_exceptions=True)
+        if activity_write_buffer is not None:
+            await activity_write_buffer.stop()
+            activity_write_buffer = None
+        client.close()
+
+app = FastAPI(lifespan=lifespan)
 api = APIRouter(prefix="/api")
 
 # CORSMiddleware as per env
@@ -61,6 +179,7 @@ def prepare_for_mongo(data: Dict[str, Any]) -> Dict[str, Any]:
 
 def parse_from_mongo(item: Dict[str, Any]) -> Dict[str, Any]:
     item.pop('_id', None)
+    item.pop('idempotency_key', None)
     for key in ['start_time', 'created_at', 'updated_at']:
         val = item.get(key)
         if isinstance(val, str):
@@ -71,13 +190,48 @@ def parse_from_mongo(item: Dict[str, Any]) -> Dict[str, Any]:
     return item
 
 
-def compute_points(distance_km: float, avg_kmh: float, duration_sec: int) -> int:
-    base = int(distance_km * 10)
-    speed_bonus = int(avg_kmh)
-    dur_bonus = int(duration_sec / 120)
+class ScoringRules(BaseModel):
+    version: int
+    points_per_km: float
+    points_per_kmh: float
+    seconds_per_point: float
+
+# Append a new version to change the gamification rules; never edit an existing one.
+SCORING_RULES: Dict[int, ScoringRules] = {
+    1: ScoringRules(version=1, points_per_km=10, points_per_kmh=1, seconds_per_point=120),
+}
+CURRENT_SCORING_VERSION = int(os.environ.get('SCORING_VERSION', max(SCORING_RULES)))
+if CURRENT_SCORING_VERSION not in SCORING_RULES:
+    raise RuntimeError(f"Unknown SCORING_VERSION {CURRENT_SCORING_VERSION}")
+
+
+def compute_points(distance_km: float, avg_kmh: float, duration_sec: int, version: int = CURRENT_SCORING_VERSION) -> int:
+    rules = SCORING_RULES[version]
+    base = int(distance_km * rules.points_per_km)
+    speed_bonus = int(avg_kmh * rules.points_per_kmh)
+    dur_bonus = int(duration_sec / rules.seconds_per_point)
     points = max(0, base + speed_bonus + dur_bonus)
     return points
 
+
+def compute_points_batch(distance_km: np.ndarray, avg_kmh: np.ndarray, duration_sec: np.ndarray, version: int = CURRENT_SCORING_VERSION) -> np.ndarray:
+    """Vectorized compute_points; np.trunc matches int() truncation toward zero."""
+    rules = SCORING_RULES[version]
+    base = np.trunc(distance_km * rules.points_per_km)
+    speed_bonus = np.trunc(avg_kmh * rules.points_per_kmh)
+    dur_bonus = np.trunc(duration_sec / rules.seconds_per_point)
+    return np.maximum(0, base + speed_bonus + dur_bonus).astype(np.int64)
+
+ROLLUP_BUCKETS = ("day", "week", "month")
+
+
+def rollup_period_start(day: date, bucket: str) -> str:
+    if bucket == "week":
+        day = day - timedelta(days=day.weekday())  # ISO weeks start on Monday
+    elif bucket == "month":
+        day = day.replace(day=1)
+    return day.isoformat()
+
 # ------------------------------------------------------------
 # Models
 # ------------------------------------------------------------
@@ -87,6 +241,7 @@ class TelemetryPoint(BaseModel):
     t: float
 
 class ActivityCreate(BaseModel):
+    id: Optional[str] = None  # client-generated id; makes retries of the same ride idempotent
     name: Optional[str] = None
     distance_km: float
     duration_sec: int
@@ -107,6 +262,7 @@ class Activity(BaseModel):
     notes: Optional[str] = None
     private: bool = False
     points_earned: int
+    scoring_version: int = 1
     created_at: datetime
     updated_at: datetime
 
@@ -174,6 +330,613 @@ async def get_or_create_default_user() -> Dict[str, Any]:
     await db.users.insert_one(prepare_for_mongo(user.copy()))
     return user
 
+class ActivityWriteBuffer:
+    """
+    Group-commits activity inserts from concurrent requests.
+    Documents are queued and flushed with one insert_many when the batch is full or
+    the oldest queued document has waited max_delay_ms. Each caller awaits a future
+    that resolves only once its batch is acknowledged with the configured write concern.
+    """
+
+    def __init__(self, collection, batch_size: int, max_delay_ms: int, write_concern: WriteConcern):
+        self.collection = collection.with_options(write_concern=write_concern)
+        self.batch_size = max(1, batch_size)
+        self.max_delay = max_delay_ms / 1000
+        self._queue: "asyncio.Queue[tuple]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        # Flush whatever is still queued before shutting down
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def insert(self, doc: Dict[str, Any]) -> None:
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((doc, fut))
+        await fut
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[tuple]) -> None:
+        docs = [doc for doc, _ in batch]
+        errors: Dict[int, Exception] = {}
+        try:
+            await self.collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            # Unordered insert: only the documents listed in writeErrors failed
+            for err in e.details.get('writeErrors', []):
+                if err.get('code') == 11000:
+                    errors[err['index']] = DuplicateKeyError(err.get('errmsg', 'duplicate key'), 11000, err)
+                else:
+                    errors[err['index']] = e
+            if e.details.get('writeConcernErrors'):
+                for i in range(len(batch)):
+                    errors.setdefault(i, e)
+        except Exception as e:
+            for i in range(len(batch)):
+                errors[i] = e
+        for i, (_, fut) in enumerate(batch):
+            if fut.done():
+                continue
+            if i in errors:
+                fut.set_exception(errors[i])
+            else:
+                fut.set_result(None)
+
+
+def _write_concern_from_env() -> WriteConcern:
+    w: Any = int(ACTIVITY_WRITE_CONCERN_W) if ACTIVITY_WRITE_CONCERN_W.isdigit() else ACTIVITY_WRITE_CONCERN_W
+    return WriteConcern(w=w, j=ACTIVITY_WRITE_CONCERN_J or None)
+
+activity_write_buffer: Optional[ActivityWriteBuffer] = None
+
+async def insert_activity(doc: Dict[str, Any]) -> None:
+    if activity_write_buffer is not None:
+        await activity_write_buffer.insert(doc)
+    else:
+        await db.activities.insert_one(doc)
+
+async def ensure_indexes() -> None:
+    await db.activities.create_index("id", unique=True)
+    # Only activities saved with an Idempotency-Key carry this field
+    await db.activities.create_index(
+        "idempotency_key",
+        unique=True,
+        partialFilterExpression={"idempotency_key": {"$exists": True}},
+    )
+    # Bulk export streams rides in start_time order; without this index Mongo sorts whole
+    # documents (paths included) in memory. Also serves tiering and the start_time filter.
+    await db.activities.create_index("start_time")
+    await db.activity_rollups.create_index([("bucket", 1), ("period_start", 1)], unique=True)
+    await db.jobs.create_index("id", unique=True)
+    await db.jobs.create_index(
+        [("type", 1), ("scoring_version", 1)],
+        unique=True,
+        partialFilterExpression={"active": True},
+        name="one_active_job_per_version",
+    )
+    await db.activity_paths_cold.create_index("id", unique=True)
+    # Listing (sorted by created_at). Equality-sort-range: only an equality prefix can be
+    # followed by the sort key; a range field first has to sort its (selective) matches in memory.
+    await db.activities.create_index([("created_at", -1)])
+    await db.activities.create_index([("private", 1), ("created_at", -1)])
+    for field in ["distance_km", "avg_kmh"]:
+        await db.activities.create_index(field)
+    for field in ["start_time", "distance_km", "avg_kmh"]:
+        await db.activities.create_index([("private", 1), (field, 1)])
+    await db.activities.create_index([("name", "text"), ("notes", "text")], weights={"name": 3, "notes": 1}, name="activities_text")
+    # Superseded by the range indexes above; the created_at suffix could never serve the sort
+    for name in ["distance_km_1_created_at_-1", "avg_kmh_1_created_at_-1"]:
+        try:
+            await db.activities.drop_index(name)
+        except OperationFailure as e:
+            if e.code != 27:  # IndexNotFound
+                raise
+
+indexes_ready = False
+
+async def retry_until_done(step, what: str, max_delay_sec: float = 30) -> Any:
+    """Await step() until it succeeds, backing off exponentially; returns its result."""
+    delay = 1.0
+    while True:
+        try:
+            return await step()
+        except Exception:
+            logging.exception("%s failed; retrying in %.0fs", what, delay)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay_sec)
+
+async def prepare_database() -> None:
+    """Startup work that needs Mongo; runs in the background so workers boot while it is unreachable."""
+    global indexes_ready
+    await retry_until_done(ensure_indexes, "ensure_indexes")
+    indexes_ready = True
+    # Only a reachable server can say whether it is a replica set; until then events stay local
+    if await retry_until_done(is_replica_set, "replica set detection"):
+        event_broker.local = False
+        background_jobs["change-stream"] = asyncio.create_task(watch_change_stream())
+    await backfill_rollups_once()
+
+# Recent activity ids kept on each rollup document, so folding a ride in twice is a no-op
+ROLLUP_APPLIED_KEEP = 1000
+# Rides newer than this may still have their own rollup upsert in flight during a rebuild
+ROLLUP_SETTLE_SEC = 60
+
+async def record_activity_rollups(act: Dict[str, Any]) -> None:
+    """Fold one activity into its day/week/month rollup documents, at most once per document."""
+    start = act["start_time"]
+    if isinstance(start, str):
+        start = datetime.fromisoformat(start)
+    day = start.astimezone(timezone.utc).date()
+    kmh = act["avg_kmh"]
+    ops = [
+        UpdateOne(
+            {"bucket": bucket, "period_start": rollup_period_start(day, bucket), "applied": {"$ne": act["id"]}},
+            {
+                "$inc": {
+                    "rides": 1,
+                    "distance_km": act["distance_km"],
+                    "duration_sec": act["duration_sec"],
+                    "points": act["points_earned"],
+                    "sum_kmh": kmh,
+                },
+                "$min": {"min_kmh": kmh},
+                "$max": {"max_kmh": kmh},
+                "$push": {"applied": {"$each": [act["id"]], "$slice": -ROLLUP_APPLIED_KEEP}},
+            },
+            upsert=True,
+        )
+        for bucket in ROLLUP_BUCKETS
+    ]
+    try:
+        await db.activity_rollups.bulk_write(ops, ordered=False)
+    except BulkWriteError as e:
+        # A document that already lists the ride fails the filter, and its upsert then hits the
+        # unique (bucket, period_start) index: that bucket already counts this ride
+        if e.details.get('writeConcernErrors') or any(err.get('code') != 11000 for err in e.details.get('writeErrors', [])):
+            raise
+
+async def rebuild_activity_rollups() -> int:
+    """
+    Recompute all rollups from the activities collection (backfill / repair).
+    The new rollups are built in a scratch collection and swapped in with one
+    renameCollection, so readers and concurrent create_activity upserts never see
+    a half-deleted collection. Rides from the last ROLLUP_SETTLE_SEC are left out of
+    the aggregate and folded in after the swap instead; record_activity_rollups skips
+    any document that already counts them, wherever their own upsert landed.
+    """
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=ROLLUP_SETTLE_SEC)).isoformat()
+    days = db.activities.aggregate([
+        {"$match": {"created_at": {"$lt": cutoff}}},
+        {"$group": {
+            "_id": {"$substrBytes": ["$start_time", 0, 10]},
+            "rides": {"$sum": 1},
+            "distance_km": {"$sum": "$distance_km"},
+            "duration_sec": {"$sum": "$duration_sec"},
+            "points": {"$sum": "$points_earned"},
+            "sum_kmh": {"$sum": "$avg_kmh"},
+            "min_kmh": {"$min": "$avg_kmh"},
+            "max_kmh": {"$max": "$avg_kmh"},
+        }},
+    ])
+    rollups: Dict[tuple, Dict[str, Any]] = {}
+    async for d in days:
+        day = date.fromisoformat(d["_id"])
+        for bucket in ROLLUP_BUCKETS:
+            key = (bucket, rollup_period_start(day, bucket))
+            cur = rollups.get(key)
+            if cur is None:
+                rollups[key] = {
+                    "bucket": key[0],
+                    "period_start": key[1],
+                    **{k: d[k] for k in ["rides", "distance_km", "duration_sec", "points", "sum_kmh", "min_kmh", "max_kmh"]},
+                }
+                continue
+            for k in ["rides", "distance_km", "duration_sec", "points", "sum_kmh"]:
+                cur[k] += d[k]
+            cur["min_kmh"] = min(cur["min_kmh"], d["min_kmh"])
+            cur["max_kmh"] = max(cur["max_kmh"], d["max_kmh"])
+    # Unique scratch name so concurrent rebuilds (e.g. from two workers) don't collide
+    scratch = db[f"activity_rollups_rebuild_{uuid.uuid4().hex}"]
+    await scratch.create_index([("bucket", 1), ("period_start", 1)], unique=True)
+    if rollups:
+        await scratch.insert_many(list(rollups.values()))
+    # Atomic swap; the unique index moves with the collection
+    await scratch.rename("activity_rollups", dropTarget=True)
+    late = db.activities.find(
+        {"created_at": {"$gte": cutoff}},
+        {"_id": 0, "id": 1, "start_time": 1, "distance_km": 1, "duration_sec": 1, "avg_kmh": 1, "points_earned": 1},
+    )
+    async for act in late:
+        await record_activity_rollups(act)
+    return len(rollups)
+
+async def backfill_rollups_once() -> None:
+    """
+    Build rollups for rides saved before rollups existed. The first worker to take the
+    lease rebuilds; the lease document then records that the backfill is done.
+    """
+    now = datetime.now(timezone.utc)
+    try:
+        await db.jobs.find_one_and_update(
+            {"id": "rollups-backfill", "done": {"$ne": True}, "lease_until": {"$lt": now.isoformat()}},
+            {"$set": {"lease_until": _lease_until()}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return  # already done, or another worker holds the lease
+    try:
+        count = await rebuild_activity_rollups()
+        await db.jobs.update_one({"id": "rollups-backfill"}, {"$set": {"done": True, "rollups": count, "lease_until": None}})
+        logging.info("backfilled %d rollup documents", count)
+    except Exception:
+        logging.exception("rollup backfill failed; the next worker start retries it")
+        await db.jobs.update_one({"id": "rollups-backfill"}, {"$set": {"lease_until": now.isoformat()}})
+
+RESCORE_BATCH_SIZE = int(os.environ.get('RESCORE_BATCH_SIZE', '5000'))
+RESCORE_LEASE_SEC = int(os.environ.get('RESCORE_LEASE_SEC', '300'))
+
+# Identifies this worker process as the holder of job leases
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Background tasks started by this worker, keyed by job id
+background_jobs: Dict[str, asyncio.Task] = {}
+
+def _lease_until() -> str:
+    return (datetime.now(timezone.utc) + timedelta(seconds=RESCORE_LEASE_SEC)).isoformat()
+
+async def claim_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Atomically take the job's lease if nobody holds an unexpired one; works across workers."""
+    now = datetime.now(timezone.utc)
+    return await db.jobs.find_one_and_update(
+        {"id": job_id, "active": True, "$or": [{"lease_until": None}, {"lease_until": {"$lt": now.isoformat()}}]},
+        {"$set": {"status": "running", "owner": WORKER_ID, "lease_until": _lease_until(), "updated_at": now.isoformat()}},
+        return_document=ReturnDocument.AFTER,
+    )
+
+async def run_rescore_job(job_id: str) -> None:
+    """
+    Re-score every activity with the job's scoring version.
+    Walks the collection in _id order and checkpoints the last _id after each batch,
+    so an interrupted job resumes where it stopped. The caller must hold the job's
+    lease (claim_job); it is renewed with every checkpoint.
+    """
+    projection = {"distance_km": 1, "avg_kmh": 1, "duration_sec": 1, "points_earned": 1, "scoring_version": 1}
+    owned = {"id": job_id, "owner": WORKER_ID}
+    release = {"owner": None, "lease_until": None}
+    try:
+        job = await db.jobs.find_one({"id": job_id})
+        version = job["scoring_version"]
+        last_id = job.get("last_id")
+        processed = job.get("processed", 0)
+        updated = job.get("updated", 0)
+        while True:
+            q = {"_id": {"$gt": last_id}} if last_id is not None else {}
+            docs = await db.activities.find(q, projection).sort("_id", 1).limit(RESCORE_BATCH_SIZE).to_list(length=RESCORE_BATCH_SIZE)
+            if not docs:
+                break
+            points = compute_points_batch(
+                np.fromiter((d.get("distance_km", 0) for d in docs), dtype=np.float64, count=len(docs)),
+                np.fromiter((d.get("avg_kmh", 0) for d in docs), dtype=np.float64, count=len(docs)),
+                np.fromiter((d.get("duration_sec", 0) for d in docs), dtype=np.float64, count=len(docs)),
+                version,
+            )
+            ops = [
+                UpdateOne({"_id": d["_id"]}, {"$set": {"points_earned": int(pts), "scoring_version": version}})
+                for d, pts in zip(docs, points)
+                if d.get("points_earned") != pts or d.get("scoring_version") != version
+            ]
+            if ops:
+                await db.activities.bulk_write(ops, ordered=False)
+            last_id = docs[-1]["_id"]
+            processed += len(docs)
+            updated += len(ops)
+            res = await db.jobs.update_one(owned, {"$set": prepare_for_mongo({
+                "last_id": last_id,
+                "processed": processed,
+                "updated": updated,
+                "lease_until": _lease_until(),
+                "updated_at": datetime.now(timezone.utc),
+            })})
+            if res.matched_count == 0:
+                logging.warning("rescore job %s: lease lost to another worker, stopping", job_id)
+                return
+        # Points changed under the rollups; recompute them once at the end
+        await rebuild_activity_rollups()
+        await db.jobs.update_one(owned, {
+            "$set": prepare_for_mongo({"status": "completed", **release, "updated_at": datetime.now(timezone.utc)}),
+            "$unset": {"active": ""},
+        })
+    except asyncio.CancelledError:
+        await db.jobs.update_one(owned, {"$set": {"status": "interrupted", **release}})
+        raise
+    except Exception as e:
+        logging.exception("rescore job %s failed", job_id)
+        try:
+            await db.jobs.update_one(owned, {"$set": {"status": "failed", "error": str(e), **release}})
+        except Exception:
+            logging.exception("rescore job %s: could not record the failure; its lease expires in %ds", job_id, RESCORE_LEASE_SEC)
+    finally:
+        background_jobs.pop(job_id, None)
+
+def job_out(doc: Dict[str, Any]) -> Dict[str, Any]:
+    out = parse_from_mongo(doc)
+    out.pop("last_id", None)
+    total = out.get("total") or 0
+    out["progress"] = min(1.0, out.get("processed", 0) / total) if total else 1.0
+    for k in ["created_at", "updated_at"]:
+        if isinstance(out.get(k), datetime):
+            out[k] = out[k].isoformat()
+    return out
+
+class EventBroker:
+    """
+    In-process pub/sub feeding the /api/events SSE stream.
+    Each subscriber gets a bounded queue; a subscriber that falls that far behind
+    misses events rather than stalling publishers.
+    When Mongo runs as a replica set, a change stream publishes instead of the
+    request handlers (local=False), so every worker sees writes made by the others.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self.local = True
+        self.closed = False
+        self._subscribers: set = set()
+        self._ids = itertools.count(1)
+
+    def subscribe(self) -> asyncio.Queue:
+        q: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        if self.closed:
+            q.put_nowait(None)  # shutting down: end the stream right away
+        self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q: asyncio.Queue) -> None:
+        self._subscribers.discard(q)
+
+    def publish(self, event: str, data: Dict[str, Any]) -> None:
+        msg = (next(self._ids), event, data)
+        for q in list(self._subscribers):
+            try:
+                q.put_nowait(msg)
+            except asyncio.QueueFull:
+                logging.warning("dropping %s event for slow SSE subscriber", event)
+
+    def publish_local(self, event: str, data: Dict[str, Any]) -> None:
+        if self.local:
+            self.publish(event, data)
+
+    def open(self) -> None:
+        self.closed = False
+        self.local = True
+
+    def close(self) -> None:
+        # Ends every open stream so shutdown can drain
+        self.closed = True
+        for q in list(self._subscribers):
+            try:
+                q.put_nowait(None)
+            except asyncio.QueueFull:
+                q.get_nowait()
+                q.put_nowait(None)
+
+event_broker = EventBroker()
+
+def begin_shutdown() -> None:
+    """
+    Called by the server (workers.DrainingServer) as soon as shutdown starts, before it
+    waits for open connections: SSE streams never finish on their own, so they would
+    otherwise hold the worker until it is killed and lifespan shutdown never runs.
+    """
+    event_broker.close()
+
+def _iso(v: Any) -> Any:
+    return v.isoformat() if isinstance(v, (datetime, date)) else v
+
+def activity_event(act: Dict[str, Any]) -> Dict[str, Any]:
+    keys = ["id", "name", "distance_km", "duration_sec", "avg_kmh", "start_time", "private", "points_earned", "created_at"]
+    return {k: _iso(act.get(k)) for k in keys}
+
+def profile_event(profile: Dict[str, Any], avatar_updated: bool) -> Dict[str, Any]:
+    # The avatar can be megabytes; clients re-fetch the profile when avatar_updated is set
+    out = {k: _iso(profile.get(k)) for k in ["id", "name", "email", "updated_at"]}
+    out["avatar_updated"] = avatar_updated
+    return out
+
+async def watch_change_stream() -> None:
+    """Republish activity inserts and user updates from a Mongo change stream."""
+    pipeline = [{"$match": {
+        "$or": [
+            {"ns.coll": "activities", "operationType": "insert"},
+            {"ns.coll": "users", "operationType": {"$in": ["update", "replace"]}},
+        ],
+    }}]
+    resume_token = None
+    while True:
+        try:
+            async with db.watch(pipeline, full_document="updateLookup", resume_after=resume_token) as stream:
+                async for change in stream:
+                    resume_token = stream.resume_token
+                    doc = change.get("fullDocument") or {}
+                    if change["ns"]["coll"] == "activities":
+                        event_broker.publish("activity.created", activity_event(doc))
+                        continue
+                    fields = set((change.get("updateDescription") or {}).get("updatedFields", {}))
+                    if change["operationType"] == "update" and any(f.split(".")[0] == "preferences" for f in fields):
+                        event_broker.publish("settings.updated", {"settings": doc.get("preferences", {})})
+                    else:
+                        event_broker.publish("profile.updated", profile_event(doc, "avatar_b64" in fields or change["operationType"] == "replace"))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logging.exception("change stream failed; reconnecting")
+            await asyncio.sleep(1)
+
+async def is_replica_set() -> bool:
+    hello = await client.admin.command("hello")
+    return "setName" in hello
+
+# ---- Hot/cold tiering of full-resolution paths ----
+TIERING_AGE_DAYS = int(os.environ.get('TIERING_AGE_DAYS', '90'))
+TIERING_BATCH_SIZE = int(os.environ.get('TIERING_BATCH_SIZE', '50'))
+TIERING_INTERVAL_SEC = int(os.environ.get('TIERING_INTERVAL_SEC', '0'))  # 0 = only via /api/admin/tiering/run
+TIERING_SIMPLIFY_TOLERANCE_M = float(os.environ.get('TIERING_SIMPLIFY_TOLERANCE_M', '5'))
+COLD_PATH_CODEC = "zstd-f8x3"  # zstd-compressed little-endian float64 (lat, lng, t) triples
+
+def encode_cold_path(path: List[Dict[str, Any]]) -> bytes:
+    arr = np.array([[p["lat"], p["lng"], p["t"]] for p in path], dtype="<f8")
+    return zstandard.ZstdCompressor(level=10).compress(arr.tobytes())
+
+def decode_cold_path(blob: bytes) -> List[Dict[str, Any]]:
+    arr = np.frombuffer(zstandard.ZstdDecompressor().decompress(blob), dtype="<f8").reshape(-1, 3)
+    return [{"lat": float(lat), "lng": float(lng), "t": float(t)} for lat, lng, t in arr]
+
+def simplify_path(path: List[Dict[str, Any]], tolerance_m: float) -> List[Dict[str, Any]]:
+    """Ramer-Douglas-Peucker on an equirectangular projection (metres); keeps both endpoints."""
+    if len(path) < 3:
+        return list(path)
+    lat = np.array([p["lat"] for p in path])
+    lng = np.array([p["lng"] for p in path])
+    y = np.radians(lat) * 6_371_000
+    x = np.radians(lng) * 6_371_000 * np.cos(np.radians(lat.mean()))
+    keep = np.zeros(len(path), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(path) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        dx, dy = x[end] - x[start], y[end] - y[start]
+        px, py = x[start + 1:end] - x[start], y[start + 1:end] - y[start]
+        seg = np.hypot(dx, dy)
+        if seg == 0:
+            dist = np.hypot(px, py)
+        else:
+            dist = np.abs(dx * py - dy * px) / seg
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance_m:
+            mid = start + 1 + i
+            keep[mid] = True
+            stack.append((start, mid))
+            stack.append((mid, end))
+    return [p for p, k in zip(path, keep) if k]
+
+def build_tiering_docs(docs: List[Dict[str, Any]], archived_at: str) -> List[tuple]:
+    """CPU-bound half of a tiering batch (compress + simplify); run off the event loop."""
+    out = []
+    for d in docs:
+        path = d.get("path") or []
+        cold = {
+            "id": d["id"],
+            "codec": COLD_PATH_CODEC,
+            "points": len(path),
+            "path": Binary(encode_cold_path(path)),
+            "archived_at": archived_at,
+        }
+        hot = {
+            "path": simplify_path(path, TIERING_SIMPLIFY_TOLERANCE_M),
+            "path_tier": "cold",
+            "path_points": len(path),
+        }
+        out.append((d["_id"], cold, hot))
+    return out
+
+async def run_tiering_pass() -> int:
+    """Move full-resolution paths of rides older than TIERING_AGE_DAYS to the cold collection."""
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=TIERING_AGE_DAYS)).isoformat()
+    query = {"start_time": {"$lt": cutoff}, "path_tier": {"$exists": False}}
+    moved = 0
+    while True:
+        docs = await db.activities.find(query, {"_id": 1, "id": 1, "path": 1}).limit(TIERING_BATCH_SIZE).to_list(length=TIERING_BATCH_SIZE)
+        if not docs:
+            break
+        # Long rides take ~0.1s each to compress and simplify; keep SSE, readiness and inserts responsive
+        prepared = await asyncio.to_thread(build_tiering_docs, docs, datetime.now(timezone.utc).isoformat())
+        cold_ops = [ReplaceOne({"id": cold["id"]}, cold, upsert=True) for _, cold, _ in prepared]
+        hot_ops = [UpdateOne({"_id": _id}, {"$set": hot}) for _id, _, hot in prepared]
+        # Cold copy first: a crash in between only leaves a hot ride to be re-archived next pass
+        await db.activity_paths_cold.bulk_write(cold_ops, ordered=False)
+        await db.activities.bulk_write(hot_ops, ordered=False)
+        moved += len(docs)
+    return moved
+
+async def load_cold_paths(activity_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    if not activity_ids:
+        return {}
+    blobs = {d["id"]: d["path"] async for d in db.activity_paths_cold.find({"id": {"$in": activity_ids}})}
+    return await asyncio.to_thread(lambda: {k: decode_cold_path(v) for k, v in blobs.items()})
+
+async def tiering_loop() -> None:
+    # Every worker runs this loop; a lease in the jobs collection lets only one of them work per interval
+    while True:
+        now = datetime.now(timezone.utc)
+        try:
+            await db.jobs.find_one_and_update(
+                {"id": "tiering-lease", "lease_until": {"$lt": now.isoformat()}},
+                {"$set": {"lease_until": (now + timedelta(seconds=TIERING_INTERVAL_SEC)).isoformat()}},
+                upsert=True,
+            )
+            moved = await run_tiering_pass()
+            if moved:
+                logging.info("tiering moved %d paths to cold storage", moved)
+        except DuplicateKeyError:
+            pass  # another worker holds the lease
+        except Exception:
+            logging.exception("tiering pass failed")
+        await asyncio.sleep(TIERING_INTERVAL_SEC)
+
+def is_same_ride(payload: ActivityCreate, doc: Dict[str, Any]) -> bool:
+    """Cheap fingerprint check that a replayed request carries the ride stored under its key or id."""
+    return (
+        doc.get("distance_km") == payload.distance_km
+        and doc.get("duration_sec") == payload.duration_sec
+        and doc.get("start_time") == payload.start_time.astimezone(timezone.utc).isoformat()
+    )
+
+async def find_replayed_activity(payload: ActivityCreate, idempotency_key: Optional[str]) -> Optional[Dict[str, Any]]:
+    # A reused key or colliding id with a different ride must not silently drop the new ride
+    if idempotency_key:
+        doc = await db.activities.find_one({"idempotency_key": idempotency_key})
+        if doc:
+            if not is_same_ride(payload, doc):
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different activity")
+            return doc
+    if payload.id:
+        doc = await db.activities.find_one({"id": payload.id})
+        if doc and not is_same_ride(payload, doc):
+            raise HTTPException(status_code=409, detail="An activity with this id already exists")
+        return doc
+    return None
+
 # ------------------------------------------------------------
 # Routes
 # ------------------------------------------------------------
@@ -181,13 +944,38 @@ async def get_or_create_default_user() -> Dict[str, Any]:
 async def health() -> APIResponse:
     return APIResponse(success=True, data={"status": "ok"}, message="Service healthy")
 
+@api.get("/ready", response_model=APIResponse)
+async def ready(response: Response) -> APIResponse:
+    pool = {
+        "max_size": MONGO_MAX_POOL_SIZE,
+        "open": pool_listener.open,
+        "in_use": pool_listener.in_use,
+        "checkout_failures": pool_listener.checkout_failures,
+    }
+    try:
+        await db.command("ping")
+    except Exception as e:
+        logging.warning("readiness ping failed: %s", e)
+        response.status_code = 503
+        return APIResponse(success=False, data={"status": "unavailable", "pool": pool}, message="Database unreachable")
+    if not indexes_ready:
+        response.status_code = 503
+        return APIResponse(success=False, data={"status": "starting", "pool": pool}, message="Indexes not created yet")
+    return APIResponse(success=True, data={"status": "ready", "pool": pool}, message="Service ready")
+
 @api.post("/activities", response_model=APIResponse)
-async def create_activity(payload: ActivityCreate) -> APIResponse:
+async def create_activity(
+    payload: ActivityCreate,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
+) -> APIResponse:
     try:
+        replayed = await find_replayed_activity(payload, idempotency_key)
+        if replayed:
+            return APIResponse(success=True, data={"activity": parse_from_mongo(replayed)}, message="Activity already saved")
         now = datetime.now(timezone.utc)
         points = compute_points(payload.distance_km, payload.avg_kmh, payload.duration_sec)
         act: Dict[str, Any] = {
-            "id": str(uuid.uuid4()),
+            "id": payload.id or str(uuid.uuid4()),
             "name": payload.name,
             "distance_km": payload.distance_km,
             "duration_sec": payload.duration_sec,
@@ -197,22 +985,92 @@ async def create_activity(payload: ActivityCreate) -> APIResponse:
             "notes": payload.notes,
             "private": payload.private,
             "points_earned": points,
+            "scoring_version": CURRENT_SCORING_VERSION,
             "created_at": now,
             "updated_at": now,
         }
-        await db.activities.insert_one(prepare_for_mongo(act.copy()))
+        doc = prepare_for_mongo(act.copy())
+        if idempotency_key:
+            doc["idempotency_key"] = idempotency_key
+        try:
+            await insert_activity(doc)
+        except DuplicateKeyError:
+            # A concurrent retry of the same request won the insert; hand back its activity
+            replayed = await find_replayed_activity(payload, idempotency_key)
+            if not replayed:
+                raise
+            return APIResponse(success=True, data={"activity": parse_from_mongo(replayed)}, message="Activity already saved")
+        try:
+            await record_activity_rollups(act)
+        except Exception:
+            # The ride is stored; a rollup rebuild will pick it up
+            logging.exception("record_activity_rollups failed")
+        event_broker.publish_local("activity.created", activity_event(act))
         return APIResponse(success=True, data={"activity": parse_from_mongo(act)}, message="Activity saved")
+    except HTTPException:
+        raise
     except Exception as e:
         logging.exception("create_activity failed")
         raise HTTPException(status_code=500, detail=str(e))
 
+def build_activity_filter(
+    start_from: Optional[datetime] = None,
+    start_to: Optional[datetime] = None,
+    min_distance_km: Optional[float] = None,
+    max_distance_km: Optional[float] = None,
+    min_avg_kmh: Optional[float] = None,
+    max_avg_kmh: Optional[float] = None,
+    private: Optional[bool] = None,
+    q: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Mongo filter for list_activities; every combination is served by an index (see ensure_indexes)."""
+    filt: Dict[str, Any] = {}
+
+    def add_range(field: str, lo: Any, hi: Any) -> None:
+        rng = {}
+        if lo is not None:
+            rng["$gte"] = lo
+        if hi is not None:
+            rng["$lte"] = hi
+        if rng:
+            filt[field] = rng
+
+    def utc_iso(v: Optional[datetime]) -> Optional[str]:
+        # start_time is stored as a UTC ISO string, so compare against the same format
+        if v is None:
+            return None
+        if v.tzinfo is None:
+            v = v.replace(tzinfo=timezone.utc)
+        return v.astimezone(timezone.utc).isoformat()
+
+    add_range("start_time", utc_iso(start_from), utc_iso(start_to))
+    add_range("distance_km", min_distance_km, max_distance_km)
+    add_range("avg_kmh", min_avg_kmh, max_avg_kmh)
+    if private is not None:
+        filt["private"] = private
+    if q:
+        filt["$text"] = {"$search": q}
+    return filt
+
 @api.get("/activities", response_model=APIResponse)
-async def list_activities(limit: int = 20, offset: int = 0) -> APIResponse:
+async def list_activities(
+    limit: int = 20,
+    offset: int = 0,
+    start_from: Optional[datetime] = None,
+    start_to: Optional[datetime] = None,
+    min_distance_km: Optional[float] = None,
+    max_distance_km: Optional[float] = None,
+    min_avg_kmh: Optional[float] = None,
+    max_avg_kmh: Optional[float] = None,
+    private: Optional[bool] = None,
+    q: Optional[str] = None,
+) -> APIResponse:
     try:
-        q = db.activities.find().sort("created_at", -1).skip(offset).limit(limit)
-        docs = await q.to_list(length=limit)
+        filt = build_activity_filter(start_from, start_to, min_distance_km, max_distance_km, min_avg_kmh, max_avg_kmh, private, q)
+        cursor = db.activities.find(filt).sort("created_at", -1).skip(offset).limit(limit)
+        docs = await cursor.to_list(length=limit)
         items = [parse_from_mongo(d) for d in docs]
-        total = await db.activities.count_documents({})
+        total = await db.activities.count_documents(filt)
         def ensure_json_safe(doc: Dict[str, Any]) -> Dict[str, Any]:
             out = doc.copy()
             for k in ["start_time", "created_at", "updated_at"]:
@@ -226,12 +1084,166 @@ async def list_activities(limit: int = 20, offset: int = 0) -> APIResponse:
         logging.exception("list_activities failed")
         raise HTTPException(status_code=500, detail=str(e))
 
+# ---- Bulk export (GPX / CSV / Parquet), streamed with constant memory ----
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '200'))
+EXPORT_COLUMNS = ["activity_id", "name", "start_time", "distance_km", "duration_sec", "avg_kmh", "points_earned", "lat", "lng", "t"]
+EXPORT_MEDIA_TYPES = {
+    "gpx": "application/gpx+xml",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+async def iter_export_activities():
+    cursor = db.activities.find({}, {"_id": 0, "idempotency_key": 0}).sort("start_time", 1).batch_size(EXPORT_BATCH_SIZE)
+    batch: List[Dict[str, Any]] = []
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            for d in await _with_full_paths(batch):
+                yield d
+            batch = []
+    for d in await _with_full_paths(batch):
+        yield d
+
+async def _with_full_paths(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Exports are full resolution: swap archived rides' simplified paths for the cold copies
+    cold = await load_cold_paths([d["id"] for d in batch if d.get("path_tier") == "cold"])
+    for d in batch:
+        if d["id"] in cold:
+            d["path"] = cold[d["id"]]
+    return batch
+
+def activity_point_rows(act: Dict[str, Any]):
+    """Flatten one activity into one row per path point (one row with empty coordinates if it has no path)."""
+    summary = [act.get("id"), act.get("name"), act.get("start_time"), act.get("distance_km"),
+               act.get("duration_sec"), act.get("avg_kmh"), act.get("points_earned")]
+    path = act.get("path") or [{}]
+    for p in path:
+        yield summary + [p.get("lat"), p.get("lng"), p.get("t")]
+
+def _gpx_time(t: Any) -> str:
+    return datetime.fromtimestamp(t, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+async def export_gpx(activities):
+    yield ('<?xml version="1.0" encoding="UTF-8"?>\n'
+           '<gpx version="1.1" creator="Go VV" xmlns="http://www.topografix.com/GPX/1/1">\n')
+    async for act in activities:
+        parts = [f"<trk><name>{xml_escape(act.get('name') or 'Ride')}</name>"]
+        if act.get("notes"):
+            parts.append(f"<desc>{xml_escape(act['notes'])}</desc>")
+        parts.append("<trkseg>")
+        for p in act.get("path") or []:
+            time_tag = f"<time>{_gpx_time(p['t'])}</time>" if p.get("t") is not None else ""
+            parts.append(f'<trkpt lat="{p["lat"]}" lon="{p["lng"]}">{time_tag}</trkpt>')
+        parts.append("</trkseg></trk>\n")
+        yield "".join(parts)
+    yield "</gpx>\n"
+
+async def export_csv(activities):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_COLUMNS)
+    async for act in activities:
+        writer.writerows(activity_point_rows(act))
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate(0)
+    if buf.tell():
+        yield buf.getvalue()
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands out what has been written so far; tell() stays absolute for the Parquet footer."""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        data = bytes(b)
+        self._chunks.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def drain(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks = []
+        return out
+
+async def export_parquet(activities, pa, pq):
+    schema = pa.schema([
+        ("activity_id", pa.string()),
+        ("name", pa.string()),
+        ("start_time", pa.string()),
+        ("distance_km", pa.float64()),
+        ("duration_sec", pa.int64()),
+        ("avg_kmh", pa.float64()),
+        ("points_earned", pa.int64()),
+        ("lat", pa.float64()),
+        ("lng", pa.float64()),
+        ("t", pa.float64()),
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+
+    def write_batch(acts: List[Dict[str, Any]]) -> None:
+        # Flattening, encoding and compressing a batch of long rides is CPU-bound; run off the event loop
+        columns = list(zip(*(row for act in acts for row in activity_point_rows(act))))
+        writer.write_batch(pa.RecordBatch.from_arrays(
+            [pa.array(col, type=field.type) for col, field in zip(columns, schema)],
+            schema=schema,
+        ))
+
+    batch: List[Dict[str, Any]] = []
+    async for act in activities:
+        batch.append(act)
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            await asyncio.to_thread(write_batch, batch)
+            batch = []
+            yield sink.drain()
+    if batch:
+        await asyncio.to_thread(write_batch, batch)
+    writer.close()
+    yield sink.drain()
+
+@api.get("/activities/export")
+async def export_activities(format: str = "gpx") -> StreamingResponse:
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_MEDIA_TYPES)}")
+    if format == "gpx":
+        body = export_gpx(iter_export_activities())
+    elif format == "csv":
+        body = export_csv(iter_export_activities())
+    else:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+        body = export_parquet(iter_export_activities(), pa, pq)
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="govv-rides.{format}"'},
+    )
+
 @api.get("/activities/{activity_id}", response_model=APIResponse)
-async def get_activity(activity_id: str) -> APIResponse:
+async def get_activity(activity_id: str, full: bool = False) -> APIResponse:
     try:
         doc = await db.activities.find_one({"id": activity_id})
         if not doc:
             raise HTTPException(status_code=404, detail="Activity not found")
+        if full and doc.get("path_tier") == "cold":
+            # Rehydrate the full-resolution path from the cold tier
+            cold = await load_cold_paths([activity_id])
+            if activity_id in cold:
+                doc["path"] = cold[activity_id]
+                doc.pop("path_tier", None)
         item = parse_from_mongo(doc)
         for k in ["start_time", "created_at", "updated_at"]:
             if isinstance(item.get(k), datetime):
@@ -243,6 +1255,147 @@ async def get_activity(activity_id: str) -> APIResponse:
         logging.exception("get_activity failed")
         raise HTTPException(status_code=500, detail=str(e))
 
+# ---- Stats (time-bucketed rollups) ----
+@api.get("/stats/timeseries", response_model=APIResponse)
+async def stats_timeseries(
+    bucket: str = "day",
+    from_: Optional[date] = Query(default=None, alias="from"),
+    to: Optional[date] = None,
+) -> APIResponse:
+    if bucket not in ROLLUP_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"bucket must be one of {', '.join(ROLLUP_BUCKETS)}")
+    try:
+        q: Dict[str, Any] = {"bucket": bucket}
+        period: Dict[str, str] = {}
+        if from_ is not None:
+            period["$gte"] = rollup_period_start(from_, bucket)
+        if to is not None:
+            period["$lte"] = rollup_period_start(to, bucket)
+        if period:
+            q["period_start"] = period
+        docs = await db.activity_rollups.find(q, {"_id": 0}).sort("period_start", 1).to_list(length=None)
+        items = []
+        for d in docs:
+            rides = d.get("rides", 0)
+            duration_sec = d.get("duration_sec", 0)
+            items.append({
+                "period_start": d["period_start"],
+                "rides": rides,
+                "distance_km": d.get("distance_km", 0),
+                "duration_sec": duration_sec,
+                "points": d.get("points", 0),
+                "avg_kmh": d.get("sum_kmh", 0) / rides if rides else 0,
+                "overall_kmh": d.get("distance_km", 0) / (duration_sec / 3600) if duration_sec else 0,
+                "min_kmh": d.get("min_kmh"),
+                "max_kmh": d.get("max_kmh"),
+            })
+        return APIResponse(success=True, data={"bucket": bucket, "items": items}, message="OK")
+    except Exception as e:
+        logging.exception("stats_timeseries failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api.post("/admin/rollups/rebuild", response_model=APIResponse)
+async def rebuild_rollups() -> APIResponse:
+    try:
+        count = await rebuild_activity_rollups()
+        return APIResponse(success=True, data={"rollups": count}, message="Rollups rebuilt")
+    except Exception as e:
+        logging.exception("rebuild_rollups failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api.post("/admin/rescore", response_model=APIResponse)
+async def start_rescore(version: int = CURRENT_SCORING_VERSION) -> APIResponse:
+    # New rides are always scored with CURRENT_SCORING_VERSION; re-scoring old rides to
+    # anything else would leave the two scored inconsistently
+    if version != CURRENT_SCORING_VERSION:
+        raise HTTPException(status_code=400, detail=f"Can only re-score to the active scoring version {CURRENT_SCORING_VERSION} (set SCORING_VERSION to change it)")
+    try:
+        now = datetime.now(timezone.utc)
+        new_id = str(uuid.uuid4())
+        # At most one active job per version (partial unique index); reuse it to resume
+        try:
+            job = await db.jobs.find_one_and_update(
+                {"type": "rescore", "scoring_version": version, "active": True},
+                {"$setOnInsert": prepare_for_mongo({
+                    "id": new_id,
+                    "status": "pending",
+                    "total": await db.activities.estimated_document_count(),
+                    "processed": 0,
+                    "updated": 0,
+                    "last_id": None,
+                    "owner": None,
+                    "lease_until": None,
+                    "created_at": now,
+                    "updated_at": now,
+                })},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Another worker created it concurrently
+            job = await db.jobs.find_one({"type": "rescore", "scoring_version": version, "active": True})
+        claimed = await claim_job(job["id"])
+        if claimed is None:
+            return APIResponse(success=True, data={"job": job_out(job)}, message="Rescore already running")
+        background_jobs[claimed["id"]] = asyncio.create_task(run_rescore_job(claimed["id"]))
+        message = "Rescore started" if claimed["id"] == new_id else "Rescore resumed"
+        return APIResponse(success=True, data={"job": job_out(claimed)}, message=message)
+    except Exception as e:
+        logging.exception("start_rescore failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api.get("/admin/jobs/{job_id}", response_model=APIResponse)
+async def get_job(job_id: str) -> APIResponse:
+    try:
+        doc = await db.jobs.find_one({"id": job_id})
+        if not doc:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return APIResponse(success=True, data={"job": job_out(doc)}, message="OK")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.exception("get_job failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api.post("/admin/tiering/run", response_model=APIResponse)
+async def run_tiering() -> APIResponse:
+    try:
+        moved = await run_tiering_pass()
+        return APIResponse(success=True, data={"moved": moved, "age_days": TIERING_AGE_DAYS}, message="Tiering pass complete")
+    except Exception as e:
+        logging.exception("run_tiering failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ---- Live updates (Server-Sent Events) ----
+SSE_KEEPALIVE_SEC = 15
+
+@api.get("/events")
+async def events(request: Request) -> StreamingResponse:
+    async def stream():
+        queue = event_broker.subscribe()
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    msg = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SEC)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                if msg is None:
+                    break
+                event_id, event, data = msg
+                yield f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+        finally:
+            event_broker.unsubscribe(queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # ---- Contact Email (Gmail SMTP placeholder) ----
 
 def _send_gmail_email(to_email: str, subject: str, body: str) -> bool:
@@ -315,6 +1468,7 @@ async def update_profile(payload: UserProfileUpdate) -> APIResponse:
             v = out.get(k)
             if isinstance(v, datetime):
                 out[k] = v.isoformat()
+        event_broker.publish_local("profile.updated", profile_event(out, updates.get('avatar_b64', existing.get('avatar_b64')) != existing.get('avatar_b64')))
         return APIResponse(success=True, data={"profile": out}, message="Profile updated")
     except HTTPException:
         raise
@@ -348,6 +1502,7 @@ async def update_settings(payload: UserSettingsUpdate) -> APIResponse:
                 "updated_at": datetime.now(timezone.utc)
             })
         })
+        event_broker.publish_local("settings.updated", {"settings": new_prefs})
         return APIResponse(success=True, data={"settings": new_prefs}, message="Settings updated")
     except Exception as e:
         logging.exception("update_settings failed")
@@ -355,8 +1510,3 @@ async def update_settings(payload: UserSettingsUpdate) -> APIResponse:
 
 # Register API router
 app.include_router(api)
-
-# Graceful shutdown
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
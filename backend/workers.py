@@ -0,0 +1,38 @@
+# Gunicorn worker for the Go VV API (see gunicorn.conf.py).
+#
+# Stock uvicorn waits for every open connection to finish before it runs the
+# app's lifespan shutdown. /api/events streams never finish, so a worker with a
+# connected EventSource would hang until gunicorn kills it, skipping the
+# write-buffer flush, job checkpoints and client.close(). This worker tells the
+# app to end its streams as soon as shutdown starts.
+import sys
+
+from gunicorn.arbiter import Arbiter
+from uvicorn import Server
+from uvicorn.workers import UvicornWorker
+
+
+class DrainingServer(Server):
+    async def shutdown(self, sockets=None) -> None:
+        # The app module is already imported by the time a worker shuts down
+        from server import begin_shutdown
+
+        begin_shutdown()
+        await super().shutdown(sockets=sockets)
+
+
+class DrainingUvicornWorker(UvicornWorker):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        # Backstop for any other long-lived request: cancel it early enough that
+        # lifespan shutdown still runs inside gunicorn's graceful_timeout
+        self.config.timeout_graceful_shutdown = max(1, self.cfg.graceful_timeout - 10)
+
+    async def _serve(self) -> None:
+        # Same as UvicornWorker._serve, with DrainingServer
+        self.config.app = self.wsgi
+        server = DrainingServer(config=self.config)
+        self._install_sigquit_handler()
+        await server.serve(sockets=self.sockets)
+        if not server.started:
+            sys.exit(Arbiter.WORKER_BOOT_ERROR)
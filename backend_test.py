@@ -443,6 +443,138 @@ def test_update_user_settings():
         log_test("Update User Settings", False, f"Request failed: {str(e)}")
         return False
 
+def test_idempotent_create_activity():
+    """Test 10: POST /api/activities replayed with the same Idempotency-Key"""
+    try:
+        payload = {
+            "name": "Retried Ride",
+            "distance_km": 1.2,
+            "duration_sec": 300,
+            "avg_kmh": 14.4,
+            "start_time": "2025-07-02T08:00:00Z",
+            "path": [
+                {"lat": 37.77, "lng": -122.41, "t": 1720000000},
+                {"lat": 37.7705, "lng": -122.409, "t": 1720000060}
+            ],
+            "private": False
+        }
+        headers = {'Content-Type': 'application/json', 'Idempotency-Key': f"test-{datetime.now().timestamp()}"}
+        
+        first = requests.post(f"{BACKEND_URL}/api/activities", json=payload, headers=headers, timeout=10)
+        second = requests.post(f"{BACKEND_URL}/api/activities", json=payload, headers=headers, timeout=10)
+        
+        if first.status_code != 200 or second.status_code != 200:
+            log_test("Idempotent Create Activity", False, f"Expected status 200 twice, got {first.status_code} and {second.status_code}")
+            return False
+            
+        first_act = first.json().get('data', {}).get('activity', {})
+        second_act = second.json().get('data', {}).get('activity', {})
+        
+        if not first_act.get('id') or first_act.get('id') != second_act.get('id'):
+            log_test("Idempotent Create Activity", False, f"Replay returned a different activity: {first_act.get('id')} vs {second_act.get('id')}")
+            return False
+            
+        if first_act.get('points_earned') != second_act.get('points_earned'):
+            log_test("Idempotent Create Activity", False, "Replay recomputed points_earned")
+            return False
+            
+        log_test("Idempotent Create Activity", True, f"Replay returned original activity {first_act.get('id')}")
+        return True
+        
+    except Exception as e:
+        log_test("Idempotent Create Activity", False, f"Request failed: {str(e)}")
+        return False
+
+def test_stats_timeseries():
+    """Test 11: GET /api/stats/timeseries?bucket=day|week|month"""
+    try:
+        for bucket in ["day", "week", "month"]:
+            response = requests.get(f"{BACKEND_URL}/api/stats/timeseries?bucket={bucket}&from=2025-07-01&to=2025-07-31", timeout=10)
+            
+            if response.status_code != 200:
+                log_test("Stats Timeseries", False, f"Expected status 200 for bucket={bucket}, got {response.status_code}")
+                return False
+                
+            items = response.json().get('data', {}).get('items', [])
+            if len(items) < 1:
+                log_test("Stats Timeseries", False, f"Expected at least one {bucket} bucket for July 2025, got {len(items)}")
+                return False
+                
+            for item in items:
+                for field in ['period_start', 'rides', 'distance_km', 'duration_sec', 'points', 'avg_kmh']:
+                    if field not in item:
+                        log_test("Stats Timeseries", False, f"{bucket} bucket missing field: {field}")
+                        return False
+                        
+        response = requests.get(f"{BACKEND_URL}/api/stats/timeseries?bucket=year", timeout=10)
+        if response.status_code != 400:
+            log_test("Stats Timeseries", False, f"Expected status 400 for bucket=year, got {response.status_code}")
+            return False
+            
+        log_test("Stats Timeseries", True, "Day, week and month rollups returned for July 2025")
+        return True
+        
+    except Exception as e:
+        log_test("Stats Timeseries", False, f"Request failed: {str(e)}")
+        return False
+
+def test_ready_endpoint():
+    """Test 12: GET /api/ready"""
+    try:
+        response = requests.get(f"{BACKEND_URL}/api/ready", timeout=10)
+        
+        if response.status_code != 200:
+            log_test("Ready Endpoint", False, f"Expected status 200, got {response.status_code}. Response: {response.text}")
+            return False
+            
+        data = response.json().get('data', {})
+        if data.get('status') != 'ready':
+            log_test("Ready Endpoint", False, f"Expected data.status='ready', got {data.get('status')}")
+            return False
+            
+        pool = data.get('pool', {})
+        for key in ['max_size', 'open', 'in_use']:
+            if key not in pool:
+                log_test("Ready Endpoint", False, f"Pool stats missing key: {key}")
+                return False
+                
+        log_test("Ready Endpoint", True, f"Pool: {pool}")
+        return True
+        
+    except Exception as e:
+        log_test("Ready Endpoint", False, f"Request failed: {str(e)}")
+        return False
+
+def test_export_activities():
+    """Test 13: GET /api/activities/export?format=gpx|csv"""
+    try:
+        response = requests.get(f"{BACKEND_URL}/api/activities/export?format=csv", timeout=30)
+        
+        if response.status_code != 200:
+            log_test("Export Activities", False, f"Expected status 200 for csv, got {response.status_code}")
+            return False
+            
+        lines = response.text.splitlines()
+        if not lines or not lines[0].startswith("activity_id,"):
+            log_test("Export Activities", False, f"Unexpected CSV header: {lines[:1]}")
+            return False
+            
+        if len(lines) < 2:
+            log_test("Export Activities", False, "CSV export contains no rows")
+            return False
+            
+        response = requests.get(f"{BACKEND_URL}/api/activities/export?format=gpx", timeout=30)
+        if response.status_code != 200 or "<trkpt" not in response.text or not response.text.rstrip().endswith("</gpx>"):
+            log_test("Export Activities", False, f"Invalid GPX export (status {response.status_code})")
+            return False
+            
+        log_test("Export Activities", True, f"CSV export with {len(lines) - 1} point rows and a valid GPX document")
+        return True
+        
+    except Exception as e:
+        log_test("Export Activities", False, f"Request failed: {str(e)}")
+        return False
+
 def main():
     """Run all tests in order"""
     print("Starting Backend API Tests")
@@ -475,6 +607,18 @@ def main():
     # Test 9: Update user settings
     settings_update_ok = test_update_user_settings()
     
+    # Test 10: Idempotent activity creation
+    idempotent_ok = test_idempotent_create_activity()
+    
+    # Test 11: Time-bucketed rollups
+    timeseries_ok = test_stats_timeseries()
+    
+    # Test 12: Readiness (Mongo ping + pool usage)
+    ready_ok = test_ready_endpoint()
+    
+    # Test 13: Streaming export
+    export_ok = test_export_activities()
+    
     # Summary
     print("=" * 60)
     print("TEST SUMMARY")
@@ -61,6 +61,10 @@ self.addEventListener('fetch', (event) => {
   const url = new URL(request.url);
   const isSameOrigin = url.origin === self.location.origin;
 
+  // Live update streams never end: caching one would buffer it forever, so let the browser handle it
+  const isEventStream = url.pathname.endsWith('/api/events') || (request.headers.get('accept') || '').includes('text/event-stream');
+  if (isEventStream) return;
+
   if (request.mode === 'navigate') {
     event.respondWith(handleNavigation(event));
     return;
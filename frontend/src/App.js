@@ -56,6 +56,40 @@ const InstallPrompt = () => {
   );
 };
 
+// ---------------------------
+// Live updates (Server-Sent Events from /api/events)
+//   One EventSource for the whole app; pages subscribe to the event types they
+//   care about and update their state in place instead of re-fetching lists.
+// ---------------------------
+const LIVE_EVENT_TYPES = ["activity.created", "profile.updated", "settings.updated"];
+const LiveEventsContext = React.createContext(null);
+
+const LiveEventsProvider = ({ children }) => {
+  const listeners = useRef(new Map());
+  useEffect(() => {
+    if (typeof window === "undefined" || !window.EventSource) return undefined;
+    const es = new EventSource(`${API}/events`);
+    LIVE_EVENT_TYPES.forEach((type) => es.addEventListener(type, (e) => {
+      let data; try { data = JSON.parse(e.data); } catch (err) { return; }
+      (listeners.current.get(type) || []).forEach((fn) => fn(data));
+    }));
+    return () => es.close();
+  }, []);
+  const subscribe = useCallback((type, fn) => {
+    const set = listeners.current.get(type) || new Set();
+    set.add(fn); listeners.current.set(type, set);
+    return () => set.delete(fn);
+  }, []);
+  return <LiveEventsContext.Provider value={subscribe}>{children}</LiveEventsContext.Provider>;
+};
+
+function useLiveEvent(type, handler) {
+  const subscribe = React.useContext(LiveEventsContext);
+  const handlerRef = useRef(handler);
+  handlerRef.current = handler;
+  useEffect(() => (subscribe ? subscribe(type, (data) => handlerRef.current(data)) : undefined), [subscribe, type]);
+}
+
 // ---------------------------
 // Theme Context & Provider with govv brand theme
 // ---------------------------
@@ -95,6 +129,7 @@ function useApplyTheme(theme) {
 const ThemeProvider = ({ children }) => {
   const [theme, setTheme] = useState('system');
   useEffect(() => { (async () => { try { const r = await axios.get(`${API}/user/settings`); const t = r.data?.data?.settings?.theme; if (t) setTheme(t); } catch(e){} })(); }, []);
+  useLiveEvent("settings.updated", (d) => { if (d?.settings?.theme) setTheme(d.settings.theme); });
   useApplyTheme(theme);
   const value = React.useMemo(() => ({ theme, setTheme }), [theme]);
   return <ThemeContext.Provider value={value}>{children}</ThemeContext.Provider>;
@@ -334,14 +369,21 @@ const Dashboard = () => {
   useEffect(() => {
     const load = async () => {
       try {
-        const res = await axios.get(`${API}/activities?limit=50`);
+        // sparkline comes from the daily rollups (last 30 days) instead of raw rides
+        const from = new Date(Date.now() - 29 * 86400000).toISOString().slice(0, 10);
+        const [res, series] = await Promise.all([
+          axios.get(`${API}/activities?limit=50`),
+          axios.get(`${API}/stats/timeseries?bucket=day&from=${from}`).catch(() => null),
+        ]);
         const items = res.data?.data?.items || [];
-        let totalKm = 0; let rides = items.length; let points = 0; const speeds = [];
+        let totalKm = 0; let rides = items.length; let points = 0; let speeds = [];
         const days = new Set();
         items.forEach((a) => {
           totalKm += a.distance_km || 0; points += a.points_earned || 0; speeds.push(a.avg_kmh || 0);
           const day = (a.start_time || "").slice(0, 10); if (day) days.add(day);
         });
+        const buckets = series?.data?.data?.items || [];
+        if (buckets.length) speeds = buckets.map((b) => b.avg_kmh || 0);
         // naive streak count
         let streak = 0; const today = new Date(); let d = new Date(Date.UTC(today.getUTCFullYear(), today.getUTCMonth(), today.getUTCDate()));
         while (days.has(d.toISOString().slice(0,10))) { streak += 1; d.setUTCDate(d.getUTCDate() - 1); }
@@ -353,6 +395,16 @@ const Dashboard = () => {
     load();
   }, []);
 
+  // New rides arrive over SSE; fold them into the totals instead of re-fetching
+  useLiveEvent("activity.created", (a) => {
+    setStats((s) => {
+      const points = s.points + (a.points_earned || 0);
+      if (levelFromPoints(points) > levelFromPoints(s.points)) setJustLeveled(true);
+      prevPoints.current = points;
+      return { ...s, totalKm: s.totalKm + (a.distance_km || 0), rides: s.rides + 1, points };
+    });
+  });
+
   return (
     <Shell>
       {stats.streak > 0 && (
@@ -466,6 +518,8 @@ const Track = () => {
 
   const timerRef = useRef(null);
   const pathRef = useRef([]);
+  // One Idempotency-Key per ride so a retried save never stores the ride twice
+  const saveKeyRef = useRef(null);
   const navigate = useNavigate();
 
   // Keep a ref copy of path for async callbacks
@@ -506,6 +560,7 @@ const Track = () => {
     setAvgSpeed(0);
     setPath([]);
     setStartTime(Date.now());
+    saveKeyRef.current = (window.crypto && window.crypto.randomUUID) ? window.crypto.randomUUID() : `${Date.now()}-${Math.random().toString(16).slice(2)}`;
     if (timerRef.current) { clearInterval(timerRef.current); timerRef.current = null; }
     timerRef.current = setInterval(step, 1000);
     // Optional: Clean up any existing map container if leftover
@@ -571,7 +626,9 @@ const Track = () => {
 
     try {
       // optionally save to backend
-      const res = await axios.post(`${API}/activities`, payload);
+      const res = await axios.post(`${API}/activities`, payload, {
+        headers: saveKeyRef.current ? { "Idempotency-Key": saveKeyRef.current } : {}
+      });
       if (res?.data?.success) {
         const id = res.data.data.activity.id;
         // reset local state after successful save
@@ -675,19 +732,29 @@ const Track = () => {
 const Activities = () => {
   const [loading, setLoading] = useState(true);
   const [items, setItems] = useState([]);
+  const [query, setQuery] = useState("");
 
+  // Filtering/search runs server-side (indexed); debounce typing before re-querying
   useEffect(() => {
     const load = async () => {
-      try { const res = await axios.get(`${API}/activities?limit=100`); setItems(res.data?.data?.items || []); }
+      try {
+        const params = { limit: 100 };
+        if (query.trim()) params.q = query.trim();
+        const res = await axios.get(`${API}/activities`, { params }); setItems(res.data?.data?.items || []);
+      }
       catch (e) { console.error(e); }
       finally { setLoading(false); }
     };
-    load();
-  }, []);
+    const t = setTimeout(load, query ? 300 : 0);
+    return () => clearTimeout(t);
+  }, [query]);
+
+  useLiveEvent("activity.created", (a) => { if (!query) setItems((prev) => (prev.some((x) => x.id === a.id) ? prev : [a, ...prev])); });
 
   return (
     <Shell>
       <h1 className="text-2xl font-semibold mb-4">Activity History</h1>
+      <input value={query} onChange={(e) => setQuery(e.target.value)} placeholder="Search rides by name or notes" className="w-full mb-4 px-3 py-2 rounded-lg bg-[#0e1116] border border-[#1b2430] outline-none focus:border-[#4f46e5]" />
       {loading ? (
         <div className="space-y-3">
           <Skeleton className="h-10"/>
@@ -722,7 +789,7 @@ const ActivityDetail = () => {
   const [idx, setIdx] = useState(0);
 
   useEffect(() => {
-    const load = async () => { try { const res = await axios.get(`${API}/activities/${id}`); setAct(res.data?.data?.activity || null); setIdx(0); } catch (e) { console.error(e); } };
+    const load = async () => { try { const res = await axios.get(`${API}/activities/${id}?full=true`); setAct(res.data?.data?.activity || null); setIdx(0); } catch (e) { console.error(e); } };
     load();
   }, [id]);
 
@@ -814,6 +881,16 @@ const Profile = () => {
     })();
   }, []);
 
+  useLiveEvent("activity.created", (a) => setPoints((p) => p + (a.points_earned || 0)));
+  useLiveEvent("profile.updated", async (p) => {
+    if (p.avatar_updated) {
+      try { const r = await api.get(`/user/profile`); setProfile(r.data?.data?.profile || null); setAvatar(r.data?.data?.profile?.avatar_b64 || ""); } catch (e) { console.error(e); }
+    } else {
+      setProfile((prev) => (prev ? { ...prev, ...p } : prev));
+    }
+    setName(p.name || ""); setEmail(p.email || "");
+  });
+
   const onAvatarChange = (e) => { const file = e.target.files?.[0]; if (!file) return; const reader = new FileReader(); reader.onload = () => setAvatar(reader.result); reader.readAsDataURL(file); };
   const onSave = async () => { setSaving(true); try { const r = await api.put(`/user/profile`, { name, email, avatar_b64: avatar }); setProfile(r.data?.data?.profile || null); } catch (e) { console.error(e); } finally { setSaving(false); } };
 
@@ -1179,17 +1256,19 @@ const AppRoutes = () => {
 
 function App() {
   return (
-    <ThemeProvider>
-      <AuthProvider>
-        <CartProvider>
-          <div className="App">
-            <BrowserRouter>
-              <AppRoutes />
-            </BrowserRouter>
-          </div>
-        </CartProvider>
-      </AuthProvider>
-    </ThemeProvider>
+    <LiveEventsProvider>
+      <ThemeProvider>
+        <AuthProvider>
+          <CartProvider>
+            <div className="App">
+              <BrowserRouter>
+                <AppRoutes />
+              </BrowserRouter>
+            </div>
+          </CartProvider>
+        </AuthProvider>
+      </ThemeProvider>
+    </LiveEventsProvider>
   );
 }
 
@@ -0,0 +1,106 @@
+"""
+Shared setup for the backend unit tests: makes backend/server.py importable,
+provides one factory for ride documents shaped like those stored in db.activities,
+and an in-memory stand-in for the handful of collections the request handlers use.
+"""
+import asyncio
+import math
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+
+RIDE_EPOCH = datetime(2020, 1, 1, 8, tzinfo=timezone.utc)
+
+
+def _make_path(points, wiggle_deg=0.0):
+    """One point per second heading north; wiggle_deg swings it side to side."""
+    return [
+        {"lat": 37.77 + j * 1e-4, "lng": -122.41 + wiggle_deg * math.sin(j / 3), "t": 1720000000.0 + j}
+        for j in range(points)
+    ]
+
+
+def _make_ride(i=0, points=0, wiggle_deg=0.0, **fields):
+    """The i-th ride starts i days after RIDE_EPOCH; any stored field can be overridden."""
+    start = (RIDE_EPOCH + timedelta(days=i)).isoformat()
+    ride = {
+        "id": f"ride-{i}",
+        "name": f"Ride {i}",
+        "notes": "",
+        "distance_km": 1.5 * i,
+        "duration_sec": 600 + i,
+        "avg_kmh": 15.0,
+        "start_time": start,
+        "path": _make_path(points, wiggle_deg),
+        "private": False,
+        "points_earned": 40 + i,
+        "created_at": start,
+        "updated_at": start,
+    }
+    ride.update(fields)
+    return ride
+
+
+@pytest.fixture
+def make_path():
+    return _make_path
+
+
+@pytest.fixture
+def make_ride():
+    return _make_ride
+
+
+class FakeCollection:
+    """Just enough of a Motor collection for the request handlers: equality queries, $set updates, unique keys."""
+
+    def __init__(self, unique=("id",)):
+        self.docs = []
+        self.unique = unique
+        self.bulk_ops = []
+
+    @staticmethod
+    def _matches(doc, query):
+        return all(doc.get(k) == v for k, v in query.items())
+
+    async def find_one(self, query):
+        await asyncio.sleep(0)  # a real round trip yields, so concurrent requests interleave
+        return next((dict(d) for d in self.docs if self._matches(d, query)), None)
+
+    async def insert_one(self, doc):
+        await asyncio.sleep(0)
+        for key in self.unique:
+            if key in doc and any(d.get(key) == doc[key] for d in self.docs):
+                raise DuplicateKeyError(f"E11000 duplicate key error dup key: {key}", 11000)
+        self.docs.append(dict(doc))
+
+    async def update_one(self, query, update):
+        await asyncio.sleep(0)
+        for d in self.docs:
+            if self._matches(d, query):
+                d.update(update.get("$set", {}))
+                return SimpleNamespace(matched_count=1)
+        return SimpleNamespace(matched_count=0)
+
+    async def bulk_write(self, ops, ordered=True):
+        self.bulk_ops.extend(ops)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = SimpleNamespace(
+        activities=FakeCollection(unique=("id", "idempotency_key")),
+        activity_rollups=FakeCollection(),
+        users=FakeCollection(),
+    )
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "activity_write_buffer", None)
+    return db
@@ -0,0 +1,107 @@
+"""
+Explain-plan checks for the list_activities filters.
+Needs a reachable MongoDB (MONGO_URL from backend/.env); skipped otherwise.
+"""
+import asyncio
+import itertools
+from datetime import datetime, timezone
+
+import pytest
+
+import server
+
+N_RIDES = 2000
+
+# Each filter alone matches well under 1% of the rides, so a plan that only walks the
+# created_at sort index would lose to the filter's own index
+FILTERS = {
+    "start_range": {"start_from": datetime(2024, 1, 1, tzinfo=timezone.utc), "start_to": datetime(2024, 1, 10, tzinfo=timezone.utc)},
+    "distance_range": {"min_distance_km": 50.0, "max_distance_km": 50.3},
+    "speed_range": {"min_avg_kmh": 33.0, "max_avg_kmh": 33.1},
+    "private": {"private": True},
+    "text": {"q": "commute"},
+}
+FILTER_FIELDS = {
+    "start_range": "start_time",
+    "distance_range": "distance_km",
+    "speed_range": "avg_kmh",
+    "private": "private",
+}
+TEXT_STAGES = {"TEXT", "TEXT_MATCH", "TEXT_OR"}
+
+
+def _stages(plan):
+    # Slot-based-engine explains (MongoDB 7+) nest the classic plan under queryPlan
+    if "queryPlan" in plan:
+        plan = plan["queryPlan"]
+    yield plan.get("stage"), plan.get("keyPattern")
+    for key in ("inputStage", "outerStage", "innerStage"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+def _rides(make_ride):
+    # Rides one day apart from 2020-01-01, so start_range covers 9 of them
+    return [
+        make_ride(
+            i,
+            name="Morning commute" if i % 200 == 1 else "Evening loop",
+            distance_km=i * 0.05,
+            avg_kmh=(i * 7 % N_RIDES) * 0.02,
+            private=i % 200 == 0,
+        )
+        for i in range(N_RIDES)
+    ]
+
+
+async def _explain_all(rides):
+    server.client = server.create_mongo_client(server.PoolUsageListener())
+    server.db = server.client[f"{server.DB_NAME}_explain_test"]
+    try:
+        await server.client.admin.command("ping")
+    except Exception:
+        server.client.close()
+        return None
+    try:
+        await server.db.activities.drop()
+        await server.ensure_indexes()
+        await server.db.activities.insert_many(rides)
+        plans = {}
+        for n in range(len(FILTERS) + 1):
+            for combo in itertools.combinations(FILTERS, n):
+                kwargs = {k: v for name in combo for k, v in FILTERS[name].items()}
+                cursor = server.db.activities.find(server.build_activity_filter(**kwargs)).sort("created_at", -1).limit(20)
+                explain = await cursor.explain()
+                plans[combo] = list(_stages(explain["queryPlanner"]["winningPlan"]))
+        return plans
+    finally:
+        await server.client.drop_database(server.db.name)
+        server.client.close()
+
+
+@pytest.fixture
+def isolated_server_db():
+    saved = server.client, server.db
+    yield
+    server.client, server.db = saved
+
+
+def test_every_filter_combination_uses_its_own_index(isolated_server_db, make_ride):
+    plans = asyncio.run(_explain_all(_rides(make_ride)))
+    if plans is None:
+        pytest.skip("MongoDB not reachable")
+    for combo, stages in plans.items():
+        names = {stage for stage, _ in stages}
+        leading = {next(iter(kp)) for stage, kp in stages if stage == "IXSCAN" and kp}
+        label = combo or "no filters"
+        assert "COLLSCAN" not in names, f"{label} ran as a collection scan: {stages}"
+        if "text" in combo:
+            # $text queries must go through the text index
+            assert names & TEXT_STAGES, f"{label} did not use the text index: {stages}"
+        elif combo:
+            wanted = {FILTER_FIELDS[name] for name in combo}
+            assert leading & wanted, f"{label} used {leading or names}, not an index on {sorted(wanted)}"
+        else:
+            assert leading == {"created_at"}, f"unfiltered listing did not use the created_at index: {stages}"
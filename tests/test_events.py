@@ -0,0 +1,84 @@
+"""
+Handlers publish live-update events to /api/events subscribers through the EventBroker.
+"""
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+import server
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    broker = server.EventBroker()
+    monkeypatch.setattr(server, "event_broker", broker)
+    return broker
+
+
+def _published(broker, handler):
+    """Run handler() with a subscriber attached and return the (event, data) pairs it received."""
+    async def run():
+        q = broker.subscribe()
+        await handler()
+        out = []
+        while not q.empty():
+            _, event, data = q.get_nowait()
+            out.append((event, data))
+        return out
+
+    return asyncio.run(run())
+
+
+def _ride():
+    return server.ActivityCreate(distance_km=12.5, duration_sec=2400, avg_kmh=18.75, start_time=datetime(2025, 7, 1, 8, tzinfo=timezone.utc), name="Commute")
+
+
+def test_create_activity_publishes_activity_created(fake_db, broker):
+    (event, data), = _published(broker, lambda: server.create_activity(_ride(), idempotency_key=None))
+    assert event == "activity.created"
+    assert data["id"] == fake_db.activities.docs[0]["id"]
+    assert data["name"] == "Commute" and data["distance_km"] == 12.5
+    # Events carry a summary, never the (possibly huge) path
+    assert "path" not in data and data["start_time"] == "2025-07-01T08:00:00+00:00"
+
+
+def test_replayed_activity_publishes_nothing(fake_db, broker):
+    asyncio.run(server.create_activity(_ride(), idempotency_key="key-1"))
+    assert _published(broker, lambda: server.create_activity(_ride(), idempotency_key="key-1")) == []
+
+
+def test_update_profile_publishes_profile_updated(fake_db, broker):
+    payload = server.UserProfileUpdate(name="Ada", avatar_b64="aGVsbG8=")
+    (event, data), = _published(broker, lambda: server.update_profile(payload))
+    assert event == "profile.updated"
+    assert data["id"] == server.DEFAULT_USER_ID and data["name"] == "Ada"
+    # Clients re-fetch the avatar instead of receiving it in the event
+    assert data["avatar_updated"] is True and "avatar_b64" not in data
+
+
+def test_update_settings_publishes_settings_updated(fake_db, broker):
+    (event, data), = _published(broker, lambda: server.update_settings(server.UserSettingsUpdate(theme="dark")))
+    assert event == "settings.updated"
+    assert data["settings"]["theme"] == "dark"
+
+
+def test_handlers_leave_publishing_to_change_stream_when_not_local(fake_db, broker):
+    broker.local = False
+
+    async def all_writes():
+        await server.create_activity(_ride(), idempotency_key=None)
+        await server.update_profile(server.UserProfileUpdate(name="Ada"))
+        await server.update_settings(server.UserSettingsUpdate(theme="dark"))
+
+    assert _published(broker, all_writes) == []
+    assert len(fake_db.activities.docs) == 1  # the writes themselves still happened
+
+
+def test_closed_broker_ends_new_streams_immediately(broker):
+    broker.close()
+
+    async def run():
+        return broker.subscribe().get_nowait()
+
+    assert asyncio.run(run()) is None
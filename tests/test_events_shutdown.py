@@ -0,0 +1,52 @@
+"""
+A worker with an open /api/events stream must still shut down (and run lifespan shutdown).
+Runs a real uvicorn server on a local socket; MongoDB does not need to be reachable.
+"""
+import asyncio
+import socket
+
+import pytest
+
+uvicorn = pytest.importorskip("uvicorn")
+pytest.importorskip("gunicorn")
+
+import server  # noqa: E402
+from workers import DrainingServer  # noqa: E402
+
+
+async def _open_event_stream(uv_server):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    task = asyncio.create_task(uv_server.serve(sockets=[sock]))
+    while not uv_server.started:
+        assert not task.done(), "server failed to start"
+        await asyncio.sleep(0.05)
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /api/events HTTP/1.1\r\nHost: test\r\nAccept: text/event-stream\r\n\r\n")
+    await writer.drain()
+    received = b""
+    while b"retry:" not in received:
+        received += await asyncio.wait_for(reader.read(1024), 5)
+    return task, reader, writer
+
+
+def _config():
+    return uvicorn.Config(server.app, lifespan="on", log_level="warning")
+
+
+def test_shutdown_completes_with_open_event_stream():
+    async def run():
+        uv_server = DrainingServer(_config())
+        task, reader, writer = await _open_event_stream(uv_server)
+        uv_server.should_exit = True
+        await asyncio.wait_for(task, 10)
+        # The stream was ended by the server, not left dangling
+        rest = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+        return rest
+
+    rest = asyncio.run(run())
+    assert rest.endswith(b"0\r\n\r\n"), "event stream was not terminated cleanly"
+    assert server.event_broker.closed
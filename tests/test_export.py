@@ -0,0 +1,83 @@
+"""
+Streaming export encoders, driven with in-memory rides (no MongoDB needed).
+"""
+import asyncio
+import csv
+import io
+
+import pytest
+
+import server
+
+
+@pytest.fixture
+def make_export_rides(make_ride):
+    # every third ride has no path and still exports one row
+    return lambda n: [make_ride(i, points=0 if i % 3 == 0 else i + 1) for i in range(n)]
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+async def _collect(stream):
+    return [chunk async for chunk in stream]
+
+
+def _expected_rows(rides):
+    return sum(max(1, len(r["path"])) for r in rides)
+
+
+def test_parquet_export_streams_record_batches_and_reads_back(monkeypatch, make_export_rides):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setattr(server, "EXPORT_BATCH_SIZE", 2)
+    rides = make_export_rides(7)
+
+    chunks = asyncio.run(_collect(server.export_parquet(_aiter(rides), pa, pq)))
+
+    # Bytes leave after every batch instead of once at the end
+    assert len([c for c in chunks if c]) > 1
+    data = b"".join(chunks)
+    table = pq.read_table(io.BytesIO(data))
+    assert table.column_names == server.EXPORT_COLUMNS
+    assert table.num_rows == _expected_rows(rides)
+    assert pq.ParquetFile(io.BytesIO(data)).num_row_groups == 4  # ceil(7 rides / 2)
+    ride_5 = table.filter(pa.compute.equal(table["activity_id"], "ride-5")).to_pylist()
+    assert [r["t"] for r in ride_5] == [p["t"] for p in rides[5]["path"]]
+    empty = table.filter(pa.compute.equal(table["activity_id"], "ride-0")).to_pylist()
+    assert len(empty) == 1 and empty[0]["lat"] is None
+
+
+def test_csv_export_writes_one_row_per_point(make_export_rides):
+    rides = make_export_rides(4)
+    text = "".join(asyncio.run(_collect(server.export_csv(_aiter(rides)))))
+    rows = list(csv.reader(io.StringIO(text)))
+    assert rows[0] == server.EXPORT_COLUMNS
+    assert len(rows) - 1 == _expected_rows(rides)
+
+
+def test_gpx_export_escapes_names_and_closes_document(make_export_rides):
+    rides = make_export_rides(2)
+    rides[1]["name"] = "Tom & <Jerry>"
+    text = "".join(asyncio.run(_collect(server.export_gpx(_aiter(rides)))))
+    assert "Tom &amp; &lt;Jerry&gt;" in text
+    assert text.count("<trk>") == 2
+    assert text.rstrip().endswith("</gpx>")
+
+
+def test_parquet_batches_are_encoded_off_the_event_loop(monkeypatch, make_export_rides):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setattr(server, "EXPORT_BATCH_SIZE", 2)
+    offloaded = []
+    to_thread = asyncio.to_thread
+
+    async def spy(fn, *args):
+        offloaded.append(len(args[0]))
+        return await to_thread(fn, *args)
+
+    monkeypatch.setattr(asyncio, "to_thread", spy)
+    asyncio.run(_collect(server.export_parquet(_aiter(make_export_rides(5)), pa, pq)))
+    assert offloaded == [2, 2, 1]
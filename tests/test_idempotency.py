@@ -0,0 +1,69 @@
+"""
+Idempotent activity creation (Idempotency-Key / client id) against an in-memory activities collection.
+"""
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+import server
+
+
+@pytest.fixture
+def activities(fake_db):
+    return fake_db.activities
+
+
+def _payload(**fields):
+    ride = {"distance_km": 12.5, "duration_sec": 2400, "avg_kmh": 18.75, "start_time": datetime(2025, 7, 1, 8, tzinfo=timezone.utc)}
+    ride.update(fields)
+    return server.ActivityCreate(**ride)
+
+
+def _create(payload, key=None):
+    return server.create_activity(payload, idempotency_key=key)
+
+
+def test_concurrent_retries_with_same_key_store_one_ride(activities):
+    async def run():
+        return await asyncio.gather(_create(_payload(), "key-1"), _create(_payload(), "key-1"))
+
+    first, second = asyncio.run(run())
+    # The loser of the insert race hit the unique index and handed back the winner's ride
+    assert len(activities.docs) == 1
+    assert sorted([first.message, second.message]) == ["Activity already saved", "Activity saved"]
+    assert first.data["activity"]["id"] == second.data["activity"]["id"] == activities.docs[0]["id"]
+
+
+def test_concurrent_retries_with_same_client_id_store_one_ride(activities):
+    async def run():
+        return await asyncio.gather(_create(_payload(id="ride-a")), _create(_payload(id="ride-a")))
+
+    results = asyncio.run(run())
+    assert len(activities.docs) == 1
+    assert {r.data["activity"]["id"] for r in results} == {"ride-a"}
+
+
+def test_replay_returns_stored_ride_without_idempotency_key_field(activities):
+    saved = asyncio.run(_create(_payload(), "key-1"))
+    replayed = asyncio.run(_create(_payload(), "key-1"))
+    assert replayed.message == "Activity already saved"
+    assert replayed.data["activity"]["id"] == saved.data["activity"]["id"]
+    assert "idempotency_key" not in replayed.data["activity"]
+
+
+def test_reused_key_with_different_ride_is_rejected(activities):
+    asyncio.run(_create(_payload(), "key-1"))
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(_create(_payload(distance_km=3.0), "key-1"))
+    assert exc.value.status_code == 422
+    assert len(activities.docs) == 1
+
+
+def test_client_id_collision_with_different_ride_is_rejected(activities):
+    asyncio.run(_create(_payload(id="ride-a")))
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(_create(_payload(id="ride-a", start_time=datetime(2025, 7, 2, 8, tzinfo=timezone.utc))))
+    assert exc.value.status_code == 409
+    assert len(activities.docs) == 1
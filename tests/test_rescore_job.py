@@ -0,0 +1,38 @@
+"""
+Failure handling of the background re-score job.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import server
+
+
+class FailingJobs:
+    """db.jobs whose reads fail, e.g. Mongo stepped down right after the lease was taken."""
+
+    def __init__(self):
+        self.updates = []
+
+    async def find_one(self, query):
+        raise ConnectionError("not primary")
+
+    async def update_one(self, query, update):
+        self.updates.append((query, update))
+
+
+def test_failed_job_load_releases_lease_and_deregisters(monkeypatch):
+    jobs = FailingJobs()
+    monkeypatch.setattr(server, "db", SimpleNamespace(jobs=jobs))
+    monkeypatch.setattr(server, "background_jobs", {})
+
+    async def run():
+        task = asyncio.create_task(server.run_rescore_job("job-1"))
+        server.background_jobs["job-1"] = task
+        await task
+
+    asyncio.run(run())  # the task does not die with an unobserved exception
+    assert server.background_jobs == {}
+    (query, update), = jobs.updates
+    assert query == {"id": "job-1", "owner": server.WORKER_ID}
+    assert update["$set"]["status"] == "failed"
+    assert update["$set"]["owner"] is None and update["$set"]["lease_until"] is None
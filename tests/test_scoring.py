@@ -0,0 +1,46 @@
+"""
+The vectorized re-scoring path must score exactly like compute_points.
+"""
+import random
+
+import numpy as np
+
+import server
+
+
+def _batch_matches_scalar(rows, version):
+    arr = np.array(rows, dtype=np.float64)
+    batch = server.compute_points_batch(arr[:, 0], arr[:, 1], arr[:, 2], version)
+    expected = [server.compute_points(d, v, int(t), version) for d, v, t in rows]
+    assert batch.tolist() == expected
+
+
+def test_compute_points_batch_matches_compute_points_on_random_rides():
+    rng = random.Random(42)
+    rows = [(rng.uniform(0, 120), rng.uniform(0, 60), rng.randint(0, 36_000)) for _ in range(20_000)]
+    for version in server.SCORING_RULES:
+        _batch_matches_scalar(rows, version)
+
+
+def test_compute_points_batch_matches_on_truncation_edges():
+    # Exact multiples, values just below them, zeros and negatives (int() truncates toward zero)
+    rows = [
+        (0.0, 0.0, 0),
+        (2.5, 15.0, 600),
+        (0.1, 0.999, 119),
+        (0.3, 14.999999, 120),
+        (1.0, 1.0, 121),
+        (-0.05, -3.7, 0),
+        (-5.0, 2.0, 30),
+    ]
+    for version in server.SCORING_RULES:
+        _batch_matches_scalar(rows, version)
+
+
+def test_version_1_keeps_original_formula():
+    assert server.compute_points(2.5, 15.0, 600, 1) == int(2.5 * 10) + int(15.0) + int(600 / 120)
+
+
+def test_compute_points_batch_handles_empty_batch():
+    empty = np.array([], dtype=np.float64)
+    assert server.compute_points_batch(empty, empty, empty).tolist() == []
@@ -0,0 +1,51 @@
+"""
+Pure helpers behind hot/cold path tiering.
+"""
+import server
+
+
+def test_cold_path_round_trips_exactly(make_path):
+    path = make_path(1000, wiggle_deg=3e-4)
+    assert server.decode_cold_path(server.encode_cold_path(path)) == path
+
+
+def test_cold_path_round_trips_empty_path():
+    assert server.decode_cold_path(server.encode_cold_path([])) == []
+
+
+def test_cold_path_is_compressed(make_path):
+    path = make_path(1000)
+    assert len(server.encode_cold_path(path)) < 1000 * 3 * 8
+
+
+def test_simplify_keeps_endpoints_and_drops_collinear_points(make_path):
+    path = make_path(500)  # straight line north
+    simplified = server.simplify_path(path, tolerance_m=5)
+    assert simplified == [path[0], path[-1]]
+
+
+def test_simplify_keeps_endpoints_and_shape_of_wiggly_path(make_path):
+    path = make_path(500, wiggle_deg=3e-4)  # ~25 m side to side
+    simplified = server.simplify_path(path, tolerance_m=5)
+    assert simplified[0] == path[0] and simplified[-1] == path[-1]
+    assert 2 < len(simplified) < len(path)
+    # Kept points are a subsequence of the original, in order
+    ts = [p["t"] for p in simplified]
+    assert ts == sorted(ts)
+
+
+def test_simplify_short_paths_unchanged(make_path):
+    for n in range(3):
+        path = make_path(n)
+        assert server.simplify_path(path, tolerance_m=5) == path
+
+
+def test_build_tiering_docs_pairs_cold_copy_with_simplified_hot_path(make_ride):
+    docs = [make_ride(i, points=50 * i, wiggle_deg=3e-4, _id=i) for i in range(3)]
+    prepared = server.build_tiering_docs(docs, "2025-01-01T00:00:00+00:00")
+    assert [p[0] for p in prepared] == [0, 1, 2]
+    for d, (_, cold, hot) in zip(docs, prepared):
+        assert cold["id"] == d["id"] and cold["points"] == len(d["path"])
+        assert server.decode_cold_path(bytes(cold["path"])) == d["path"]
+        assert hot["path_tier"] == "cold" and hot["path_points"] == len(d["path"])
+        assert hot["path"][:1] == d["path"][:1] and hot["path"][-1:] == d["path"][-1:]
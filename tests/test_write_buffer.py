@@ -0,0 +1,153 @@
+"""
+Group commit of activity inserts (ActivityWriteBuffer) against a fake collection.
+"""
+import asyncio
+
+from pymongo import WriteConcern
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+import server
+
+
+class FakeCollection:
+    """Records insert_many batches; `fail` may raise to simulate a failed bulk insert."""
+
+    def __init__(self, fail=None):
+        self.batches = []
+        self.fail = fail
+        self.write_concern = None
+
+    def with_options(self, write_concern):
+        self.write_concern = write_concern
+        return self
+
+    async def insert_many(self, docs, ordered=True):
+        assert not ordered
+        self.batches.append(list(docs))
+        if self.fail:
+            self.fail(docs)
+
+
+def _buffer(collection, batch_size=100, max_delay_ms=10_000):
+    buf = server.ActivityWriteBuffer(collection, batch_size=batch_size, max_delay_ms=max_delay_ms, write_concern=WriteConcern(w=1))
+    buf.start()
+    return buf
+
+
+def _docs(n):
+    return [{"id": f"ride-{i}"} for i in range(n)]
+
+
+def test_flushes_as_soon_as_batch_is_full():
+    coll = FakeCollection()
+
+    async def run():
+        buf = _buffer(coll, batch_size=3)
+        # max_delay is 10s: only a full batch can resolve these within the timeout
+        await asyncio.wait_for(asyncio.gather(*(buf.insert(d) for d in _docs(3))), 1)
+        await buf.stop()
+
+    asyncio.run(run())
+    assert coll.batches == [_docs(3)]
+    assert coll.write_concern == WriteConcern(w=1)
+
+
+def test_flushes_partial_batch_at_deadline():
+    coll = FakeCollection()
+
+    async def run():
+        buf = _buffer(coll, batch_size=100, max_delay_ms=50)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await asyncio.wait_for(asyncio.gather(*(buf.insert(d) for d in _docs(2))), 1)
+        waited = loop.time() - started
+        await buf.stop()
+        return waited
+
+    waited = asyncio.run(run())
+    assert coll.batches == [_docs(2)]
+    assert waited >= 0.04
+
+
+def test_duplicate_key_fails_only_that_caller():
+    def fail(docs):
+        raise BulkWriteError({
+            "writeErrors": [{"index": 1, "code": 11000, "errmsg": "E11000 duplicate key error"}],
+            "writeConcernErrors": [],
+        })
+
+    async def run():
+        buf = _buffer(FakeCollection(fail), batch_size=3)
+        results = await asyncio.gather(*(buf.insert(d) for d in _docs(3)), return_exceptions=True)
+        await buf.stop()
+        return results
+
+    first, second, third = asyncio.run(run())
+    assert first is None and third is None
+    assert isinstance(second, DuplicateKeyError) and second.code == 11000
+
+
+def test_write_concern_error_fails_whole_batch():
+    def fail(docs):
+        raise BulkWriteError({
+            "writeErrors": [],
+            "writeConcernErrors": [{"code": 64, "errmsg": "waiting for replication timed out"}],
+        })
+
+    async def run():
+        buf = _buffer(FakeCollection(fail), batch_size=3)
+        results = await asyncio.gather(*(buf.insert(d) for d in _docs(3)), return_exceptions=True)
+        await buf.stop()
+        return results
+
+    # The documents may be stored, but not with the durability the callers asked for
+    assert all(isinstance(r, BulkWriteError) for r in asyncio.run(run()))
+
+
+def test_stop_flushes_queued_inserts():
+    coll = FakeCollection()
+
+    async def run():
+        buf = _buffer(coll)
+        tasks = [asyncio.create_task(buf.insert(d)) for d in _docs(2)]
+        await asyncio.sleep(0)  # let both reach the queue; neither batch size nor deadline is hit
+        await buf.stop()
+        await asyncio.wait_for(asyncio.gather(*tasks), 1)
+
+    asyncio.run(run())
+    assert coll.batches == [_docs(2)]
+
+
+def test_cancelled_caller_is_skipped():
+    coll = FakeCollection()
+
+    async def run():
+        buf = _buffer(coll, batch_size=2)
+        gone = asyncio.create_task(buf.insert({"id": "ride-gone"}))
+        await asyncio.sleep(0)
+        gone.cancel()  # e.g. the client disconnected while its insert was queued
+        await asyncio.wait_for(buf.insert({"id": "ride-kept"}), 1)
+        alive = not buf._task.done()
+        await buf.stop()
+        return gone, alive
+
+    gone, alive = asyncio.run(run())
+    assert gone.cancelled()
+    # The flush still wrote both documents and kept running after skipping the cancelled future
+    assert alive
+    assert coll.batches == [[{"id": "ride-gone"}, {"id": "ride-kept"}]]
+
+
+def test_unexpected_error_fails_whole_batch():
+    error = RuntimeError("connection reset")
+
+    def fail(docs):
+        raise error
+
+    async def run():
+        buf = _buffer(FakeCollection(fail), batch_size=2)
+        results = await asyncio.gather(*(buf.insert(d) for d in _docs(2)), return_exceptions=True)
+        await buf.stop()
+        return results
+
+    assert asyncio.run(run()) == [error, error]